@@ -6,6 +6,7 @@ Import and use these functions in your API endpoints for database operations.
 """
 
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
@@ -15,8 +16,12 @@ from pydantic import BaseModel
 # Load environment variables from .env file
 load_dotenv()
 
+DB_UNAVAILABLE_MESSAGE = "Database not available. Check DATABASE_URL and DATABASE_NAME environment variables."
+
 _client = None
 db = None
+_async_client = None
+async_db = None
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
@@ -24,13 +29,13 @@ database_name = os.getenv("DATABASE_NAME")
 if database_url and database_name:
     _client = MongoClient(database_url)
     db = _client[database_name]
+    # Async (Motor) handle for use from async endpoints without blocking the event loop
+    _async_client = AsyncIOMotorClient(database_url)
+    async_db = _async_client[database_name]
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
-    """Insert a single document with timestamp"""
-    if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-
+def _prepare_document(data: Union[BaseModel, dict]) -> dict:
+    """Convert data to a fresh dict and stamp created_at/updated_at"""
     # Convert Pydantic model to dict if needed
     if isinstance(data, BaseModel):
         data_dict = data.model_dump()
@@ -39,16 +44,42 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
 
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
+    return data_dict
 
-    result = db[collection_name].insert_one(data_dict)
+def create_document(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp"""
+    if db is None:
+        raise Exception(DB_UNAVAILABLE_MESSAGE)
+
+    result = db[collection_name].insert_one(_prepare_document(data))
+    return str(result.inserted_id)
+
+async def create_document_async(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp (async, via Motor)"""
+    if async_db is None:
+        raise Exception(DB_UNAVAILABLE_MESSAGE)
+
+    result = await async_db[collection_name].insert_one(_prepare_document(data))
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, sort: dict = None, stringify_ids: bool = False):
+    """Get documents from collection (with string _id values if stringify_ids is set)"""
     if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
+        raise Exception(DB_UNAVAILABLE_MESSAGE)
+
+    if stringify_ids:
+        # Let MongoDB convert ObjectIds instead of looping over the results in Python
+        pipeline = [{"$match": filter_dict or {}}]
+        if sort:
+            pipeline.append({"$sort": sort})
+        if limit:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$addFields": {"_id": {"$toString": "$_id"}}})
+        return list(db[collection_name].aggregate(pipeline))
+
     cursor = db[collection_name].find(filter_dict or {})
+    if sort:
+        cursor = cursor.sort(list(sort.items()))
     if limit:
         cursor = cursor.limit(limit)
     
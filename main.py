@@ -1,15 +1,39 @@
 import os
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import re
+import html
+import time
+import ssl
+import asyncio
+from types import SimpleNamespace
+from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
-import smtplib
+from typing import List, Optional, Tuple, Union
+import aiosmtplib
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from email import policy
+from email.headerregistry import BaseHeader
 from email.message import EmailMessage
 
-from database import create_document, get_documents
+from database import DB_UNAVAILABLE_MESSAGE, async_db, create_document_async, get_documents
 from schemas import UnlockRequest
 
-app = FastAPI(title="Phone Unlock Service API")
+# SMTP settings are resolved once at import (after database.py has loaded .env)
+# rather than on every send.
+_smtp_user = os.getenv("SMTP_USER")
+SMTP_CFG = SimpleNamespace(
+    host=os.getenv("SMTP_HOST"),
+    port=int(os.getenv("SMTP_PORT", "587")),
+    user=_smtp_user,
+    password=os.getenv("SMTP_PASS"),
+    from_email=os.getenv("FROM_EMAIL", _smtp_user or "no-reply@phonelockremover.com"),
+    admin_email=os.getenv("ADMIN_EMAIL", "process@phonelockremover.com"),
+)
+SMTP_ENABLED = bool(SMTP_CFG.host and SMTP_CFG.user and SMTP_CFG.password)
+
+app = FastAPI(title="Phone Unlock Service API", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,13 +43,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Static responses and env-derived status, computed once at import
+_ROOT_RESP = {"message": "Phone Unlock Service Backend Running"}
+_HELLO_RESP = {"message": "Hello from the backend API!"}
+_DB_URL_STATUS = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
+_DB_NAME_STATUS = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
+
 @app.get("/")
-def read_root():
-    return {"message": "Phone Unlock Service Backend Running"}
+async def read_root():
+    return _ROOT_RESP
 
 @app.get("/api/hello")
-def hello():
-    return {"message": "Hello from the backend API!"}
+async def hello():
+    return _HELLO_RESP
+
+# /test is used as a health check; cache the listCollections round trip briefly
+COLLECTIONS_CACHE_TTL_SECONDS = 30
+_collections_cache = {"value": None, "expires": 0.0}
+
+
+def _cached_collections(db) -> list:
+    now = time.monotonic()
+    if _collections_cache["value"] is None or now >= _collections_cache["expires"]:
+        _collections_cache["value"] = db.list_collection_names()[:10]
+        _collections_cache["expires"] = now + COLLECTIONS_CACHE_TTL_SECONDS
+    return _collections_cache["value"]
+
 
 @app.get("/test")
 def test_database():
@@ -49,8 +92,7 @@ def test_database():
             response["connection_status"] = "Connected"
             
             try:
-                collections = db.list_collection_names()
-                response["collections"] = collections[:10]
+                response["collections"] = _cached_collections(db)
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
                 response["database"] = f"⚠️  Connected but Error: {str(e)[:50]}"
@@ -62,93 +104,370 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
     
-    import os
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
+    response["database_url"] = _DB_URL_STATUS
+    response["database_name"] = _DB_NAME_STATUS
     
     return response
 
 # Email helpers
 
-def _send_email_smtp(subject: str, to_email: str, html_body: str, text_body: Optional[str] = None):
-    host = os.getenv("SMTP_HOST")
-    port = int(os.getenv("SMTP_PORT", "587"))
-    user = os.getenv("SMTP_USER")
-    password = os.getenv("SMTP_PASS")
-    from_email = os.getenv("FROM_EMAIL", user or "no-reply@phonelockremover.com")
+# Reuse one SMTP connection across sends instead of paying connect + STARTTLS + LOGIN
+# per message. All sends happen on the event loop, serialized by _smtp_lock.
+SMTP_MAX_IDLE_SECONDS = 60
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100
 
-    if not host or not user or not password:
-        # Graceful no-op if SMTP not configured
-        print("[email] SMTP not configured. Skipping send.")
-        return
+_smtp_conn = None
+_smtp_lock = asyncio.Lock()
+
+# Port 465 is implicit TLS, which skips the STARTTLS + second EHLO round trips.
+# The trust store is loaded once and shared by every connection.
+SMTP_IMPLICIT_TLS_PORT = 465
+_smtp_tls_context = ssl.create_default_context()
+
+
+class SMTPConnection:
+    """A cached, authenticated SMTP connection and its usage bookkeeping"""
+
+    def __init__(self, server: aiosmtplib.SMTP):
+        self.server = server
+        self.last_used = time.monotonic()
+        self.messages_sent = 0
+
+    @classmethod
+    async def open(cls) -> "SMTPConnection":
+        implicit_tls = SMTP_CFG.port == SMTP_IMPLICIT_TLS_PORT
+        server = aiosmtplib.SMTP(
+            hostname=SMTP_CFG.host,
+            port=SMTP_CFG.port,
+            use_tls=implicit_tls,
+            start_tls=not implicit_tls,
+            tls_context=_smtp_tls_context,
+        )
+        await server.connect()
+        try:
+            await server.login(SMTP_CFG.user, SMTP_CFG.password)
+        except Exception:
+            # Don't leak the connected socket/TLS session on a failed LOGIN
+            server.close()
+            raise
+        return cls(server)
+
+    async def is_usable(self) -> bool:
+        if time.monotonic() - self.last_used > SMTP_MAX_IDLE_SECONDS:
+            return False
+        if self.messages_sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+            return False
+        try:
+            return (await self.server.noop()).code == 250
+        except (aiosmtplib.SMTPException, OSError):
+            return False
+
+    async def send(self, msg: EmailMessage):
+        await self.server.send_message(msg)
+        self.last_used = time.monotonic()
+        self.messages_sent += 1
+
+    async def close(self):
+        try:
+            await self.server.quit()
+        except Exception:
+            self.server.close()
+
+
+async def _get_smtp_connection() -> SMTPConnection:
+    """Return the cached SMTP connection, reconnecting if it is stale or closed"""
+    global _smtp_conn
+    if _smtp_conn is not None and not await _smtp_conn.is_usable():
+        await _smtp_conn.close()
+        _smtp_conn = None
+
+    if _smtp_conn is None:
+        _smtp_conn = await SMTPConnection.open()
+
+    return _smtp_conn
+
+
+def _drop_smtp_connection():
+    """Discard a connection the server has dropped (caller holds _smtp_lock)"""
+    global _smtp_conn
+    if _smtp_conn is not None:
+        _smtp_conn.server.close()
+        _smtp_conn = None
+
+
+async def close_smtp_connection():
+    global _smtp_conn
+    async with _smtp_lock:
+        if _smtp_conn is not None:
+            await _smtp_conn.close()
+            _smtp_conn = None
 
+
+# Constant address headers are parsed once; EmailMessage reuses an already-parsed
+# header object as-is instead of running it through headerregistry again.
+_FROM_HEADER = policy.default.header_factory("From", SMTP_CFG.from_email)
+_ADMIN_TO_HEADER = policy.default.header_factory("To", SMTP_CFG.admin_email)
+
+# (subject, to_email, html_body, text_body). to_email is either a plain address
+# string or a pre-parsed header (the admin path passes _ADMIN_TO_HEADER); only use
+# it as a str, e.g. for logging, not via header- or str-specific methods.
+Email = Tuple[str, Union[str, BaseHeader], str, Optional[str]]
+
+
+def _build_message(subject: str, to_email: Union[str, BaseHeader], html_body: str, text_body: Optional[str]) -> EmailMessage:
     msg = EmailMessage()
     msg["Subject"] = subject
-    msg["From"] = from_email
+    msg["From"] = _FROM_HEADER
     msg["To"] = to_email
     if text_body:
         msg.set_content(text_body)
     msg.add_alternative(html_body, subtype="html")
+    return msg
+
+
+async def _send_emails_smtp(emails: List[Tuple[str, Email]]):
+    """Send (doc_id, email) pairs over a single SMTP session
+
+    Send failures are logged per message so one bad message doesn't drop the rest.
+    If connecting or logging in fails, the rest of the batch is skipped rather than
+    retrying the handshake for every message.
+    """
+    if not SMTP_ENABLED:
+        # Graceful no-op if SMTP not configured (logged once at startup)
+        return
+
+    async with _smtp_lock:
+        conn = None
+        for i, (doc_id, (subject, to_email, html_body, text_body)) in enumerate(emails):
+            try:
+                msg = _build_message(subject, to_email, html_body, text_body)
+            except Exception as e:
+                print(f"[email] Failed to build {doc_id} to {to_email}: {e}")
+                continue
 
-    with smtplib.SMTP(host, port) as server:
-        server.starttls()
-        server.login(user, password)
-        server.send_message(msg)
-        print(f"[email] Sent to {to_email}")
+            if conn is None or conn.messages_sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+                try:
+                    conn = await _get_smtp_connection()
+                except Exception as e:
+                    skipped = ", ".join(sorted({skipped_id for skipped_id, _ in emails[i:]}))
+                    print(f"[email] Could not connect to SMTP server: {e}. Skipping notifications for {skipped}")
+                    return
+
+            try:
+                await conn.send(msg)
+                print(f"[email] Sent to {to_email}")
+            except (aiosmtplib.SMTPServerDisconnected, OSError) as e:
+                print(f"[email] Connection lost sending {doc_id} to {to_email}: {e}")
+                _drop_smtp_connection()
+                conn = None
+            except Exception as e:
+                print(f"[email] Failed to send {doc_id} to {to_email}: {e}")
 
 
-def send_admin_notification(req: UnlockRequest, doc_id: str):
-    to_email = os.getenv("ADMIN_EMAIL", "process@phonelockremover.com")
-    subject = f"New Unlock Request • {req.brand} {req.model} • {doc_id}"
-    html = f"""
+# Email bodies are module-level templates rendered with str.format_map,
+# instead of f-strings rebuilt on every call. HTML templates are well-formed and
+# minified once at import to keep each message's DATA payload small.
+def _minify_html(source: str) -> str:
+    return re.sub(r">\s+<", "><", source.strip())
+
+
+ADMIN_SUBJECT_TMPL = "New Unlock Request • {brand} {model} • {doc_id}"
+ADMIN_HTML_TMPL = _minify_html("""
+<!doctype html>
+<html>
+  <body>
     <h2>New Unlock Request</h2>
     <p><strong>Reference ID:</strong> {doc_id}</p>
     <ul>
-      <li><strong>Brand:</strong> {req.brand}</li>
-      <li><strong>Model:</strong> {req.model}</li>
-      <li><strong>Issue:</strong> {req.issue}</li>
-      <li><strong>IMEI/Serial:</strong> {req.imei}</li>
-      <li><strong>Region/Carrier:</strong> {req.region or '-'}
-      <li><strong>Name:</strong> {req.name}</li>
-      <li><strong>Email:</strong> {req.email}</li>
-      <li><strong>Notes:</strong> {req.notes or '-'}
+      <li><strong>Brand:</strong> {brand}</li>
+      <li><strong>Model:</strong> {model}</li>
+      <li><strong>Issue:</strong> {issue}</li>
+      <li><strong>IMEI/Serial:</strong> {imei}</li>
+      <li><strong>Region/Carrier:</strong> {region}</li>
+      <li><strong>Name:</strong> {name}</li>
+      <li><strong>Email:</strong> {email}</li>
+      <li><strong>Notes:</strong> {notes}</li>
     </ul>
-    <p>Status: {req.status}</p>
-    """
-    text = (
-        f"New Unlock Request\n"
-        f"ID: {doc_id}\n"
-        f"Brand: {req.brand}\nModel: {req.model}\nIssue: {req.issue}\n"
-        f"IMEI/Serial: {req.imei}\nRegion: {req.region or '-'}\n"
-        f"Name: {req.name}\nEmail: {req.email}\nNotes: {req.notes or '-'}\n"
-        f"Status: {req.status}\n"
-    )
-    _send_email_smtp(subject, to_email, html, text)
-
+    <p>Status: {status}</p>
+  </body>
+</html>
+""")
+ADMIN_TEXT_TMPL = (
+    "New Unlock Request\n"
+    "ID: {doc_id}\n"
+    "Brand: {brand}\nModel: {model}\nIssue: {issue}\n"
+    "IMEI/Serial: {imei}\nRegion: {region}\n"
+    "Name: {name}\nEmail: {email}\nNotes: {notes}\n"
+    "Status: {status}\n"
+)
 
-def send_customer_autoresponse(req: UnlockRequest, doc_id: str):
-    subject = "We received your unlock request"
-    html = f"""
-    <h2>Thanks, {req.name}!</h2>
+CUSTOMER_SUBJECT = "We received your unlock request"
+CUSTOMER_HTML_TMPL = _minify_html("""
+<!doctype html>
+<html>
+  <body>
+    <h2>Thanks, {name}!</h2>
     <p>We've received your request and will get back to you shortly.</p>
     <p><strong>Reference ID:</strong> {doc_id}</p>
     <p>Summary:</p>
     <ul>
-      <li><strong>Device:</strong> {req.brand} {req.model}</li>
-      <li><strong>Issue:</strong> {req.issue}</li>
-      <li><strong>IMEI/Serial:</strong> {req.imei}</li>
-      <li><strong>Region/Carrier:</strong> {req.region or '-'}
+      <li><strong>Device:</strong> {brand} {model}</li>
+      <li><strong>Issue:</strong> {issue}</li>
+      <li><strong>IMEI/Serial:</strong> {imei}</li>
+      <li><strong>Region/Carrier:</strong> {region}</li>
     </ul>
     <p>If anything is incorrect, reply to this email with corrections.</p>
     <p>— PhoneLockRemover</p>
-    """
-    text = (
-        f"Thanks, {req.name}! We received your unlock request.\n"
-        f"Reference ID: {doc_id}\n"
-        f"Device: {req.brand} {req.model}\nIssue: {req.issue}\nIMEI/Serial: {req.imei}\nRegion/Carrier: {req.region or '-'}\n"
-        f"We'll contact you at this email once we review.\n"
+  </body>
+</html>
+""")
+CUSTOMER_TEXT_TMPL = (
+    "Thanks, {name}! We received your unlock request.\n"
+    "Reference ID: {doc_id}\n"
+    "Device: {brand} {model}\nIssue: {issue}\nIMEI/Serial: {imei}\nRegion/Carrier: {region}\n"
+    "We'll contact you at this email once we review.\n"
+)
+
+_TEMPLATE_KEYS = ("doc_id", "brand", "model", "issue", "imei", "region", "name", "email", "notes", "status")
+
+
+def _template_fields(data: dict, doc_id: str) -> Tuple[dict, dict]:
+    """Return (text fields, HTML-escaped fields) for the email templates"""
+    fields = {
+        **data,
+        "doc_id": doc_id,
+        "region": data["region"] or "-",
+        "notes": data["notes"] or "-",
+    }
+    html_fields = {key: html.escape(str(fields[key])) for key in _TEMPLATE_KEYS}
+    return fields, html_fields
+
+
+def _admin_notification_email(fields: dict, html_fields: dict) -> Email:
+    return (
+        ADMIN_SUBJECT_TMPL.format_map(fields),
+        _ADMIN_TO_HEADER,
+        ADMIN_HTML_TMPL.format_map(html_fields),
+        ADMIN_TEXT_TMPL.format_map(fields),
+    )
+
+
+def _customer_autoresponse_email(fields: dict, html_fields: dict) -> Email:
+    return (
+        CUSTOMER_SUBJECT,
+        fields["email"],
+        CUSTOMER_HTML_TMPL.format_map(html_fields),
+        CUSTOMER_TEXT_TMPL.format_map(fields),
     )
-    _send_email_smtp(subject, req.email, html, text)
+
+
+def _notification_emails(data: dict, doc_id: str) -> List[Email]:
+    fields, html_fields = _template_fields(data, doc_id)
+    return [_admin_notification_email(fields, html_fields), _customer_autoresponse_email(fields, html_fields)]
+
+
+# Email dispatch: request handlers enqueue (data, doc_id) and a single long-lived
+# worker drains the queue in microbatches, sending each batch in one SMTP session
+# so bursts of submissions don't open a session per request.
+EMAIL_QUEUE_MAXSIZE = 1000
+EMAIL_BATCH_MAX_MESSAGES = 20
+EMAIL_BATCH_MAX_WAIT_SECONDS = 0.1
+EMAIL_SHUTDOWN_TIMEOUT_SECONDS = 10
+
+
+def _render_notifications(data: dict, doc_id: str) -> List[Tuple[str, Email]]:
+    try:
+        return [(doc_id, email) for email in _notification_emails(data, doc_id)]
+    except Exception as e:
+        print(f"[email] Failed to render notifications for {doc_id}: {e}")
+        return []
+
+
+async def _next_email_batch(queue: asyncio.Queue) -> Tuple[int, List[Tuple[str, Email]]]:
+    """Wait for one request, then collect more for up to EMAIL_BATCH_MAX_WAIT_SECONDS
+
+    Returns the number of queue items taken and their rendered (doc_id, email) pairs.
+    """
+    loop = asyncio.get_running_loop()
+    emails = _render_notifications(*await queue.get())
+    taken = 1
+    deadline = loop.time() + EMAIL_BATCH_MAX_WAIT_SECONDS
+    while len(emails) < EMAIL_BATCH_MAX_MESSAGES:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            break
+        taken += 1
+        emails.extend(_render_notifications(*item))
+    return taken, emails
+
+
+async def email_worker(queue: asyncio.Queue):
+    while True:
+        taken, emails = await _next_email_batch(queue)
+        try:
+            await _send_emails_smtp(emails)
+        except Exception as e:
+            print(f"[email] Failed to send batch: {e}")
+        finally:
+            for _ in range(taken):
+                queue.task_done()
+
+
+def queue_all_notifications(data: dict, doc_id: str):
+    """Hand notifications for a request to the email worker"""
+    try:
+        app.state.email_queue.put_nowait((data, doc_id))
+    except asyncio.QueueFull:
+        print(f"[email] Queue full. Dropping notifications for {doc_id}")
+
+
+@app.on_event("startup")
+async def start_email_worker():
+    if not SMTP_ENABLED:
+        print("[email] SMTP not configured. Email notifications are disabled.")
+        return
+    app.state.email_queue = asyncio.Queue(maxsize=EMAIL_QUEUE_MAXSIZE)
+    app.state.email_worker = asyncio.create_task(email_worker(app.state.email_queue))
+
+
+@app.on_event("shutdown")
+async def stop_email_worker():
+    if not SMTP_ENABLED:
+        return
+    try:
+        await asyncio.wait_for(app.state.email_queue.join(), EMAIL_SHUTDOWN_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print("[email] Shutdown timed out with notifications still queued")
+    app.state.email_worker.cancel()
+    await close_smtp_connection()
+
+
+# Indexes backing the admin dashboard filters and lookups; list pagination
+# itself walks the default _id index.
+UNLOCKREQUEST_INDEXES = [
+    IndexModel([("status", ASCENDING), ("_id", DESCENDING)]),
+    IndexModel([("email", ASCENDING)]),
+    IndexModel([("imei", ASCENDING)]),
+]
+
+
+async def _create_unlockrequest_indexes():
+    try:
+        await async_db.unlockrequest.create_indexes(UNLOCKREQUEST_INDEXES)
+    except Exception as e:
+        print(f"[db] Failed to create unlockrequest indexes: {e}")
+
+
+@app.on_event("startup")
+async def create_indexes():
+    # Build in the background so an unreachable Mongo doesn't hold up worker startup
+    if async_db is None:
+        return
+    app.state.index_task = asyncio.create_task(_create_unlockrequest_indexes())
 
 
 # API models for responses
@@ -156,26 +475,49 @@ class UnlockResponse(BaseModel):
     id: str
     message: str
 
-@app.post("/api/unlock", response_model=UnlockResponse)
-def submit_unlock_request(payload: UnlockRequest, background_tasks: BackgroundTasks):
+async def persist_unlock_request(data: dict, doc_id: str):
+    """Insert the request, then queue its notifications (runs after the 202 response)"""
     try:
-        doc_id = create_document("unlockrequest", payload)
-        # Fire-and-forget email notifications
-        background_tasks.add_task(send_admin_notification, payload, doc_id)
-        background_tasks.add_task(send_customer_autoresponse, payload, doc_id)
-        return {"id": doc_id, "message": "Request received. We'll email you with next steps."}
+        await create_document_async("unlockrequest", data)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        # The client already holds doc_id, but nothing was stored and no email will follow
+        print(f"[db] Failed to store unlock request {doc_id}; the id returned to the client was never persisted: {e}")
+        return
+    if SMTP_ENABLED:
+        queue_all_notifications(data, doc_id)
+
+
+@app.post("/api/unlock", response_model=UnlockResponse, status_code=202)
+async def submit_unlock_request(payload: UnlockRequest, background_tasks: BackgroundTasks):
+    if async_db is None:
+        raise HTTPException(status_code=500, detail=DB_UNAVAILABLE_MESSAGE)
+
+    # The id is generated here so the response doesn't wait on the insert round trip.
+    # Trade-off: the 202 is sent before the insert, so if the background insert fails
+    # the client keeps an id that was never stored and the promised email never comes
+    # (the failure is only logged by persist_unlock_request).
+    object_id = ObjectId()
+    doc_id = str(object_id)
+    # Dump the model once and share the dict between the insert and the emails
+    data = payload.model_dump()
+    data["_id"] = object_id
+    background_tasks.add_task(persist_unlock_request, data, doc_id)
+    return {"id": doc_id, "message": "Request received. We'll email you with next steps."}
 
 @app.get("/api/unlock", response_model=List[dict])
-def list_unlock_requests(limit: Optional[int] = 50):
+def list_unlock_requests(
+    limit: int = Query(50, ge=1, le=200),
+    after_id: Optional[str] = Query(None, description="Return requests older than this id (newest first)"),
+):
+    # Keyset pagination on the _id index rather than skip-based paging
+    filter_dict = {}
+    if after_id is not None:
+        if not ObjectId.is_valid(after_id):
+            raise HTTPException(status_code=400, detail="Invalid after_id")
+        filter_dict = {"_id": {"$lt": ObjectId(after_id)}}
+
     try:
-        docs = get_documents("unlockrequest", limit=limit)
-        # Convert ObjectId to str if present
-        for d in docs:
-            if "_id" in d:
-                d["_id"] = str(d["_id"])
-        return docs
+        return get_documents("unlockrequest", filter_dict, limit=limit, sort={"_id": -1}, stringify_ids=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -183,4 +525,5 @@ def list_unlock_requests(limit: Optional[int] = 50):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, loop="uvloop", http="httptools")
@@ -11,7 +11,7 @@ Model name is converted to lowercase for the collection name:
 - BlogPost -> "blogs" collection
 """
 
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, EmailStr
 from typing import Optional, Literal
 
 # Example schemas (replace with your own):
@@ -44,6 +44,8 @@ class UnlockRequest(BaseModel):
     Unlock requests from the multistep form
     Collection name: "unlockrequest" (lowercase of class name)
     """
+    model_config = ConfigDict(frozen=True, str_strip_whitespace=True, extra='forbid', validate_assignment=False)
+
     brand: str = Field(..., description="Device brand, e.g., Apple, Samsung")
     model: str = Field(..., description="Device model name")
     issue: str = Field(..., description="Lock type or issue to resolve")